@@ -1,10 +1,14 @@
+import asyncio
 import logging
+import signal
 
 import discord
 from discord.ext import commands
 import sentry_sdk
 
 from config import config
+from cogs.utils.db import engine
+from cogs.utils.lifecycle import Lifecycle
 
 logging.basicConfig(
     level=logging.INFO, format="[%(asctime)s][%(levelname)s] %(message)s"
@@ -20,8 +24,37 @@ bot = commands.Bot(
     intents=discord.Intents.all(),
 )
 
+bot.lifecycle = Lifecycle(bot, drain_timeout=config.DRAIN_TIMEOUT)
+# 書き込み待ちのコネクションを閉じてからプロセスを終了する
+bot.lifecycle.register("shutdown", "db", engine.dispose)
+
 bot.load_extension("cogs.Admin")
 bot.load_extension("cogs.CogManager")
 bot.load_extension("cogs.RoleManager")
 
-bot.run(config.TOKEN)
\ No newline at end of file
+
+async def main():
+    await bot.lifecycle.setup()
+    try:
+        await bot.start(config.TOKEN)
+    finally:
+        await bot.lifecycle.shutdown()
+
+
+loop = bot.loop
+for sig in (signal.SIGINT, signal.SIGTERM):
+    loop.add_signal_handler(sig, bot.lifecycle.request_shutdown)
+try:
+    loop.run_until_complete(main())
+finally:
+    # bot.runと同様に、残ったタスクをキャンセルしてからループを閉じる
+    tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if tasks:
+        logging.warning(
+            f"未完了のタスクをキャンセルします。件数:{len(tasks)} ジョブ:{bot.lifecycle.pending_jobs}"
+        )
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
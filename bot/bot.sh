@@ -1,4 +1,5 @@
 #!/bin/sh
 
 SCRIPT_DIR=$(cd $(dirname $0); pwd)
-python3 $SCRIPT_DIR/bot.py
\ No newline at end of file
+# SIGTERMをPythonに直接届けるためexecする
+exec python3 $SCRIPT_DIR/bot.py
\ No newline at end of file
@@ -19,8 +19,8 @@ class Admin(commands.Cog):
             content=f"Pong! {round((end - start) * 1000)}ms"
         )
 
-    @commands.Cog.listener(name="on_ready")
-    async def on_ready(self):
+    @commands.Cog.listener(name="on_lifecycle_ready")
+    async def on_lifecycle_ready(self):
         await config.NOTIFY_TO_OWNER(self.bot, "Ready!")
 
     
@@ -1,3 +1,4 @@
+import logging
 import time
 
 import discord
@@ -13,6 +14,7 @@ from sqlalchemy import Column, Integer, String, BigInteger, delete
 
 from .utils.db import engine
 from .utils.common import CommonUtil
+from .utils.lifecycle import NotReady, lifecycle_job
 
 Base = declarative_base()
 c = CommonUtil()
@@ -60,6 +62,7 @@ class RoleSelect(DiscordSelect):
             max_values=len(options),
         )
 
+    @lifecycle_job
     async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer()
         if self.view is None:
@@ -144,19 +147,35 @@ class RoleManager(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.session = sessionmaker(bind=engine, class_=AsyncSession)
+        # テーブル作成はログイン前、ロールの同期はコマンド受付開始前に行う
+        self.bot.lifecycle.register("setup", "RoleManager", create_tables)
+        self.bot.lifecycle.register("warmup", "RoleManager", self.update_role_mappings)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        await create_tables()
-        await self.update_role_mappings()
+        # 初回はwarmupで同期済みのため、再接続時のみ同期する
+        if self.bot.lifecycle.is_ready:
+            await self.sync_role_mappings()
 
     @commands.Cog.listener()
     async def on_guild_role_create(self, role):
-        await self.update_role_mappings()
+        await self.sync_role_mappings()
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before, after):
-        await self.update_role_mappings()
+        await self.sync_role_mappings()
+
+    async def sync_role_mappings(self):
+        # イベントからの同期は停止時に完了を待つジョブとして行い、受付外なら行わない
+        try:
+            self.bot.lifecycle.start_job("update_role_mappings")
+        except NotReady:
+            logging.info("コマンド受付外のため、ロールの同期をスキップしました")
+            return
+        try:
+            await self.update_role_mappings()
+        finally:
+            self.bot.lifecycle.finish_job("update_role_mappings")
 
     async def update_role_mappings(self):
         async with self.session() as session:
@@ -202,6 +221,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="update_db", description="データベースを更新します")
     @commands.is_owner()
+    @lifecycle_job
     async def update_db(self, ctx: discord.ApplicationContext):
         await self.update_role_mappings()
         await ctx.respond("データベースを更新しました")
@@ -238,6 +258,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="inactive", description="非アクティブ化処理を行います")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def inactive(self, ctx: discord.ApplicationContext, member: Option(Member, "非アクティブ化処理を行うメンバーを指定してください", required=True)):
         # すべてのサーバーでstatic_roles以外のロールをすべて削除し、inactive_rolesのロールを付与する
         await ctx.response.defer()
@@ -280,6 +301,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="uninactive", description="非アクティブ化処理を解除します")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def uninactive(self, ctx: discord.ApplicationContext, member: Option(Member, "非アクティブ化処理を解除するメンバーを指定してください", required=True)):
         async with self.session() as session:
             inactive_roles = await session.execute(
@@ -309,6 +331,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="static", description="非アクティブ化で処理を行わないロールを設定します")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def static(self, ctx: discord.ApplicationContext, roles: Option(str, "非アクティブ化で処理を行わないロールを指定してください", required=True)):
         roles = roles.split(",")
         async with self.session() as session:
@@ -338,6 +361,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="set_inactive", description="非アクティブ化時に割り当てるロールを設定します")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def set_inactive(self, ctx: discord.ApplicationContext, role_name: Option(str, "非アクティブ化時に割り当てるロールを指定してください", required=True)):
         async with self.session() as session:
             for guild in self.bot.guilds:
@@ -365,6 +389,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="remove_inactive", description="非アクティブ化時に割り当てるロールを削除します")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def remove_inactive(self, ctx: discord.ApplicationContext):
         async with self.session() as session:
             await session.execute(delete(InactiveRole))
@@ -373,6 +398,7 @@ class RoleManager(commands.Cog):
 
     @slash_command(name="remove_static", description="非アクティブ化で処理を行わないロールを削除します")
     @commands.has_permissions(manage_roles=True)
+    @lifecycle_job
     async def remove_static(self, ctx: discord.ApplicationContext):
         async with self.session() as session:
             await session.execute(delete(StaticRole))
@@ -0,0 +1,251 @@
+import asyncio
+import enum
+import functools
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+import discord
+from discord.ext import commands
+
+
+class State(enum.Enum):
+    STARTING = "starting"
+    READY = "ready"
+    DRAINING = "draining"
+    STOPPED = "stopped"
+
+
+class NotReady(commands.CheckFailure):
+    """コマンドを受け付けられない状態のときに送出される例外"""
+
+
+class Lifecycle:
+    """Botの起動・停止処理を管理するクラス
+
+    起動時は setup フック(スキーマ作成など)をログイン前に、warmup フック
+    (キャッシュの準備など)を最初の on_ready で実行し、完了するまでコマンドを受け付けない。
+    停止時は新規コマンドの受付を止め、実行中のジョブが終わるのを待ってから
+    shutdown フックを実行し、Botを閉じる。
+    """
+
+    PHASES = ("setup", "warmup", "shutdown")
+
+    def __init__(self, bot: commands.Bot, drain_timeout: float = 25):
+        self.bot = bot
+        self.drain_timeout = drain_timeout
+        self.state = State.STARTING
+        self._hooks: dict[str, dict[str, Callable[[], Awaitable[None]]]] = {
+            phase: {} for phase in self.PHASES
+        }
+        self._jobs: Counter[str] = Counter()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._shutdown_task: asyncio.Task | None = None
+
+        bot.add_listener(self._on_ready, "on_ready")
+        bot.add_listener(
+            self._on_application_command_error, "on_application_command_error"
+        )
+        bot.add_check(self._check_ready)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state is State.READY
+
+    @property
+    def not_ready_message(self) -> str:
+        if self.state is State.STARTING:
+            return ":hourglass: 起動処理中です。しばらくしてから再度お試しください"
+        return ":hourglass: 再起動中です。しばらくしてから再度お試しください"
+
+    @property
+    def pending_jobs(self) -> list[str]:
+        return list(self._jobs.elements())
+
+    def register(
+        self, phase: str, name: str, func: Callable[[], Awaitable[None]]
+    ):
+        """フックを登録する関数
+
+        同じ名前で登録した場合は上書きされるため、Cogのリロード時に再登録してもよい。
+
+        Args:
+            phase (str): "setup", "warmup", "shutdown" のいずれか
+            name (str): フック名
+            func (Callable[[], Awaitable[None]]): 実行するコルーチン関数
+        """
+        if phase not in self._hooks:
+            raise ValueError(f"フェーズが不正です。phase:{phase}")
+        self._hooks[phase][name] = func
+
+    async def _run_hooks(self, phase: str, *, raise_errors: bool):
+        for name, func in list(self._hooks[phase].items()):
+            try:
+                await func()
+            except Exception:
+                if raise_errors:
+                    raise
+                logging.exception(f"{phase} フックの実行に失敗しました。name:{name}")
+
+    async def setup(self):
+        """ログイン前にsetupフックを実行する関数
+
+        失敗した場合は例外をそのまま送出し、起動を中止する。
+        """
+        await self._run_hooks("setup", raise_errors=True)
+        logging.info("setup が完了しました")
+
+    async def _on_ready(self):
+        # on_readyは再接続時にも呼ばれるため、warmupは初回のみ実行する
+        if self.state is not State.STARTING:
+            return
+        # warmup中に停止処理が始まった場合に備え、warmupもジョブとして扱う
+        self._add_job("warmup")
+        try:
+            await self._run_hooks("warmup", raise_errors=False)
+        finally:
+            self._remove_job("warmup")
+        if self.state is not State.STARTING:
+            logging.info("停止処理中のため、コマンドの受付を開始しません")
+            return
+        self.state = State.READY
+        logging.info("warmup が完了しました。コマンドの受付を開始します")
+        self.bot.dispatch("lifecycle_ready")
+
+    async def reject(self, target: discord.ApplicationContext | discord.Interaction):
+        """受付できない旨をコマンド使用者に返す関数
+
+        Args:
+            target (discord.ApplicationContext | discord.Interaction): 応答先
+        """
+        if isinstance(target, discord.Interaction):
+            await target.response.send_message(self.not_ready_message, ephemeral=True)
+        else:
+            await target.respond(self.not_ready_message, ephemeral=True)
+
+    async def _check_ready(self, ctx: discord.ApplicationContext) -> bool:
+        if not self.is_ready:
+            raise NotReady(self.not_ready_message)
+        return True
+
+    async def _on_application_command_error(
+        self, ctx: discord.ApplicationContext, error: discord.DiscordException
+    ):
+        # リスナーを登録するとpy-cordの既定のエラー出力が行われなくなるため、ここで代わりに行う
+        if isinstance(error, NotReady):
+            await self.reject(ctx)
+            return
+        if ctx.command and ctx.command.has_error_handler():
+            return
+        if ctx.cog and ctx.cog.has_error_handler():
+            return
+        logging.error(f"コマンドで例外が発生しました。command:{ctx.command}", exc_info=error)
+
+    def _add_job(self, name: str):
+        self._jobs[name] += 1
+        self._idle.clear()
+
+    def _remove_job(self, name: str):
+        self._jobs[name] -= 1
+        if self._jobs[name] <= 0:
+            del self._jobs[name]
+        if not self._jobs:
+            self._idle.set()
+
+    def start_job(self, name: str):
+        """停止時に完了を待つジョブを登録する関数
+
+        受付状態の確認とジョブの登録は await を挟まずに行うため、
+        登録後に停止処理が始まっても必ず完了を待つ。
+        終了時は必ず finish_job を呼ぶこと。
+
+        Args:
+            name (str): ジョブ名
+
+        Raises:
+            NotReady: コマンドを受け付けられない状態の場合
+        """
+        if not self.is_ready:
+            raise NotReady(self.not_ready_message)
+        self._add_job(name)
+
+    def finish_job(self, name: str):
+        """start_jobで登録したジョブを終了する関数
+
+        Args:
+            name (str): ジョブ名
+        """
+        self._remove_job(name)
+
+    @asynccontextmanager
+    async def job(self, name: str):
+        """停止時に完了を待つ処理を囲むコンテキストマネージャ
+
+        ロールの付け外しなど、途中で中断されると不整合が残る処理に使う。
+
+        Args:
+            name (str): ジョブ名
+
+        Raises:
+            NotReady: コマンドを受け付けられない状態の場合
+        """
+        self.start_job(name)
+        try:
+            yield
+        finally:
+            self.finish_job(name)
+
+    def request_shutdown(self):
+        """シグナルハンドラから停止処理を開始する関数"""
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.ensure_future(self._shutdown())
+
+    async def shutdown(self):
+        """実行中のジョブを待ってからshutdownフックを実行し、Botを閉じる関数
+
+        複数回呼ばれた場合も停止処理は一度だけ行い、その完了を待つ。
+        """
+        self.request_shutdown()
+        await self._shutdown_task
+
+    async def _shutdown(self):
+        self.state = State.DRAINING
+        logging.info(f"停止処理を開始します。実行中のジョブ:{self.pending_jobs}")
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                f"ジョブの完了待ちがタイムアウトしました。中断するジョブ:{self.pending_jobs}"
+            )
+
+        await self._run_hooks("shutdown", raise_errors=False)
+        await self.bot.close()
+        self.state = State.STOPPED
+        logging.info("停止処理が完了しました")
+
+
+def lifecycle_job(func):
+    """コマンドやコンポーネントのコールバックをジョブとして実行するデコレータ
+
+    受付できない状態の場合は本体を実行せず、その旨を応答する。
+    第1引数が self (bot属性を持つ) 、第2引数が ctx か interaction である関数に使う。
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, target, *args, **kwargs):
+        lifecycle: Lifecycle = self.bot.lifecycle
+        name = func.__qualname__
+        try:
+            lifecycle.start_job(name)
+        except NotReady:
+            await lifecycle.reject(target)
+            return
+        try:
+            return await func(self, target, *args, **kwargs)
+        finally:
+            lifecycle.finish_job(name)
+
+    return wrapper
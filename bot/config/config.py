@@ -8,6 +8,9 @@ OWNER_ID = os.environ.get("OWNER_ID")
 
 SENTRY_DSN = os.environ.get("SENTRY_DSN")
 
+# 停止時に実行中のジョブを待つ秒数 (docker composeのstop_grace_periodより短くする)
+DRAIN_TIMEOUT = float(os.environ.get("DRAIN_TIMEOUT", 25))
+
 
 async def NOTIFY_TO_OWNER(bot, message: str):
     owner = await bot.fetch_user(OWNER_ID)